@@ -41,7 +41,7 @@ Requires:       pexpect                     >= 2.3
 Requires:       python-babel                >= 2.0
 Requires:       python-cliff                >= 1.13.0
 Requires:       python-cliff-tablib         >= 1.1
-Requires:       python-jsonpickle           >= 0.9.2
+Requires:       python-futures              >= 3.0
 Requires:       python-oslo-i18n            >= 2.5.0
 Requires:       python-paramiko             >= 1.15.1
 Requires:       python-pbr                  >= 1.6.0
@@ -12,11 +12,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 import json
-import jsonpickle
 import logging
 import os
-import tempfile
-import traceback
+
+from collections import OrderedDict
+from concurrent.futures import as_completed
+from concurrent.futures import ThreadPoolExecutor
 
 from kollacli import exceptions
 from kollacli import utils
@@ -31,40 +32,51 @@ ANSIBLE_BECOME = 'ansible_become'
 
 INVENTORY_PATH = 'ansible/inventory.json'
 
+# here-document delimiter of the json generator script
+JSON_GEN_EOF = 'KOLLACLI_JSON_EOF'
+
+# max number of hosts set up concurrently by setup_hosts
+MAX_SETUP_WORKERS = 32
+
 COMPUTE_GRP_NAME = 'compute'
 CONTROL_GRP_NAME = 'control'
 NETWORK_GRP_NAME = 'network'
 STORAGE_GRP_NAME = 'storage'
 DATABASE_GRP_NAME = 'database'
 
-DEPLOY_GROUPS = [
+DEPLOY_GROUPS = (
     COMPUTE_GRP_NAME,
     CONTROL_GRP_NAME,
     NETWORK_GRP_NAME,
     STORAGE_GRP_NAME,
     DATABASE_GRP_NAME,
-    ]
+    )
 
 SERVICES = {
-    'cinder':       ['cinder-api', 'cinder-scheduler', 'cinder-backup',
-                     'cinder-volume'],
-    'glance':       ['glance-api', 'glance-registry'],
-    'haproxy':      [],
-    'heat':         ['heat-api', 'heat-api-cfn', 'heat-engine'],
-    'horizon':      [],
-    'keystone':     [],
-    'memcached':    [],
-    'murano':       ['murano-api', 'murano-engine'],
-    'mysqlcluster': ['mysqlcluster-api', 'mysqlcluster-mgmt',
-                     'mysqlcluster-ndb'],
-    'neutron':      ['neutron-server', 'neutron-agents'],
-    'nova':         ['nova-api', 'nova-conductor', 'nova-consoleauth',
-                     'nova-novncproxy', 'nova-scheduler'],
-    'rabbitmq':     [],
-    'swift':        ['swift-proxy-server', 'swift-account-server',
-                     'swift-container-server', 'swift-object-server'],
+    'cinder':       ('cinder-api', 'cinder-scheduler', 'cinder-backup',
+                     'cinder-volume'),
+    'glance':       ('glance-api', 'glance-registry'),
+    'haproxy':      (),
+    'heat':         ('heat-api', 'heat-api-cfn', 'heat-engine'),
+    'horizon':      (),
+    'keystone':     (),
+    'memcached':    (),
+    'murano':       ('murano-api', 'murano-engine'),
+    'mysqlcluster': ('mysqlcluster-api', 'mysqlcluster-mgmt',
+                     'mysqlcluster-ndb'),
+    'neutron':      ('neutron-server', 'neutron-agents'),
+    'nova':         ('nova-api', 'nova-conductor', 'nova-consoleauth',
+                     'nova-novncproxy', 'nova-scheduler'),
+    'rabbitmq':     (),
+    'swift':        ('swift-proxy-server', 'swift-account-server',
+                     'swift-container-server', 'swift-object-server'),
     }
 
+# sub-service name to its parent service name
+_SUB_TO_PARENT = dict((sub_svcname, svcname)
+                      for svcname, sub_svcnames in SERVICES.items()
+                      for sub_svcname in sub_svcnames)
+
 DEFAULT_GROUPS = {
     'cinder':                   CONTROL_GRP_NAME,
     'glance':                   CONTROL_GRP_NAME,
@@ -93,10 +105,23 @@ DEFAULT_OVERRIDES = {
 
 
 # these groups cannot be deleted, they are required by kolla
-PROTECTED_GROUPS = [COMPUTE_GRP_NAME]
+PROTECTED_GROUPS = frozenset([COMPUTE_GRP_NAME])
+
+
+def _remote_vars(remote_flag, admin_user=None):
+    """return the ansible connection vars for the deploy mode"""
+    if remote_flag:
+        # ssh info for all the servers in the group
+        return {ANSIBLE_BECOME: 'yes',
+                ANSIBLE_SSH_USER: admin_user or utils.get_admin_user()}
+    # no ssh info, local connection type
+    return {ANSIBLE_BECOME: 'yes',
+            ANSIBLE_CONNECTION: 'local'}
 
 
 class Host(object):
+    __slots__ = ('name', 'alias', 'is_mgmt', 'hypervisor', 'vars', 'version')
+
     class_version = 1
     log = logging.getLogger(__name__)
 
@@ -117,29 +142,62 @@ class Host(object):
     def upgrade(self):
         pass
 
+    def to_dict(self):
+        return {'name': self.name,
+                'alias': self.alias,
+                'is_mgmt': self.is_mgmt,
+                'hypervisor': self.hypervisor,
+                'vars': self.vars,
+                'version': self.version}
+
+    @classmethod
+    def from_dict(cls, host_dict):
+        host = cls(host_dict['name'])
+        host.alias = host_dict.get('alias', '')
+        host.is_mgmt = host_dict.get('is_mgmt', False)
+        host.hypervisor = host_dict.get('hypervisor', '')
+        host.vars = host_dict.get('vars', {})
+        host.version = host_dict.get('version', cls.class_version)
+        return host
+
 
 class HostGroup(object):
+    __slots__ = ('name', 'hostnames', 'vars', 'version')
+
     class_version = 1
 
     def __init__(self, name):
         self.name = name
-        self.hostnames = []
+        self.hostnames = OrderedDict()     # used as an ordered set
         self.vars = {}
         self.version = self.__class__.class_version
 
     def upgrade(self):
         pass
 
+    def to_dict(self):
+        return {'name': self.name,
+                'hostnames': list(self.hostnames),
+                'vars': self.vars,
+                'version': self.version}
+
+    @classmethod
+    def from_dict(cls, group_dict):
+        group = cls(group_dict['name'])
+        group.hostnames = OrderedDict.fromkeys(
+            group_dict.get('hostnames', []))
+        group.vars = group_dict.get('vars', {})
+        group.version = group_dict.get('version', cls.class_version)
+        return group
+
     def add_host(self, host):
-        if host.name not in self.hostnames:
-            self.hostnames.append(host.name)
+        self.hostnames[host.name] = None
 
     def remove_host(self, host):
-        if host.name in self.hostnames:
-            self.hostnames.remove(host.name)
+        self.hostnames.pop(host.name, None)
 
     def get_hostnames(self):
-        return self.hostnames
+        return list(self.hostnames)
 
     def get_vars(self):
         return self.vars.copy()
@@ -151,61 +209,78 @@ class HostGroup(object):
         if name in self.vars:
             del self.vars[name]
 
-    def set_remote(self, remote_flag):
-        self.set_var(ANSIBLE_BECOME, 'yes')
-        if remote_flag:
-            # set the ssh info for all the servers in the group
-            self.set_var(ANSIBLE_SSH_USER, utils.get_admin_user())
-            self.clear_var(ANSIBLE_CONNECTION)
-        else:
-            # remove ssh info, add local connection type
-            self.set_var(ANSIBLE_CONNECTION, 'local')
-            self.clear_var(ANSIBLE_SSH_USER)
+    def set_remote(self, remote_flag, admin_user=None):
+        # drop the connection vars of the other mode, then set this one's
+        self.vars.pop(ANSIBLE_SSH_USER, None)
+        self.vars.pop(ANSIBLE_CONNECTION, None)
+        self.vars.update(_remote_vars(remote_flag, admin_user))
 
 
 class Service(object):
+    __slots__ = ('name', '_sub_servicenames', '_groupnames', '_vars',
+                 'version')
+
     class_version = 1
 
     def __init__(self, name):
         self.name = name
-        self._sub_servicenames = []
-        self._groupnames = []
+        self._sub_servicenames = OrderedDict()     # used as an ordered set
+        self._groupnames = OrderedDict()           # used as an ordered set
         self._vars = {}
         self.version = self.__class__.class_version
 
     def upgrade(self):
         pass
 
+    def to_dict(self):
+        return {'name': self.name,
+                '_sub_servicenames': list(self._sub_servicenames),
+                '_groupnames': list(self._groupnames),
+                '_vars': self._vars,
+                'version': self.version}
+
+    @classmethod
+    def from_dict(cls, svc_dict):
+        service = cls(svc_dict['name'])
+        service._sub_servicenames = OrderedDict.fromkeys(
+            svc_dict.get('_sub_servicenames', []))
+        service._groupnames = OrderedDict.fromkeys(
+            svc_dict.get('_groupnames', []))
+        service._vars = svc_dict.get('_vars', {})
+        service.version = svc_dict.get('version', cls.class_version)
+        return service
+
     def add_groupname(self, groupname):
-        if groupname is not None and groupname not in self._groupnames:
-            self._groupnames.append(groupname)
+        if groupname is not None:
+            self._groupnames[groupname] = None
 
     def remove_groupname(self, groupname):
-        if groupname in self._groupnames:
-            self._groupnames.remove(groupname)
+        self._groupnames.pop(groupname, None)
 
     def get_groupnames(self):
-        return self._groupnames
+        return list(self._groupnames)
 
     def get_sub_servicenames(self):
-        return self._sub_servicenames
+        return list(self._sub_servicenames)
 
     def add_sub_servicename(self, sub_servicename):
-        if sub_servicename not in self._sub_servicenames:
-            self._sub_servicenames.append(sub_servicename)
+        self._sub_servicenames[sub_servicename] = None
 
     def get_vars(self):
         return self._vars.copy()
 
 
 class SubService(object):
+    __slots__ = ('name', '_groupnames', '_parent_servicename', '_vars',
+                 'version')
+
     class_version = 1
 
     def __init__(self, name):
         self.name = name
 
         # groups and parent services are mutually exclusive
-        self._groupnames = []
+        self._groupnames = OrderedDict()     # used as an ordered set
         self._parent_servicename = None
 
         self._vars = {}
@@ -214,33 +289,49 @@ class SubService(object):
     def upgrade(self):
         pass
 
+    def to_dict(self):
+        return {'name': self.name,
+                '_groupnames': list(self._groupnames),
+                '_parent_servicename': self._parent_servicename,
+                '_vars': self._vars,
+                'version': self.version}
+
+    @classmethod
+    def from_dict(cls, sub_svc_dict):
+        sub_service = cls(sub_svc_dict['name'])
+        sub_service._groupnames = OrderedDict.fromkeys(
+            sub_svc_dict.get('_groupnames', []))
+        sub_service._parent_servicename = \
+            sub_svc_dict.get('_parent_servicename')
+        sub_service._vars = sub_svc_dict.get('_vars', {})
+        sub_service.version = sub_svc_dict.get('version', cls.class_version)
+        return sub_service
+
     def add_groupname(self, groupname):
         if groupname not in self._groupnames:
-            self._groupnames.append(groupname)
+            self._groupnames[groupname] = None
             self._parent_servicename = None
 
     def remove_groupname(self, groupname):
-        if groupname in self._groupnames:
-            self._groupnames.remove(groupname)
+        self._groupnames.pop(groupname, None)
         if not self._groupnames:
             # no groups left, re-associate to the parent
-            for servicename in SERVICES:
-                if self.name in SERVICES[servicename]:
-                    self.set_parent_servicename(servicename)
-                    break
+            parent_svcname = _SUB_TO_PARENT.get(self.name)
+            if parent_svcname:
+                self.set_parent_servicename(parent_svcname)
 
     def get_groupnames(self):
-        return self._groupnames
+        return list(self._groupnames)
 
     def set_parent_servicename(self, parent_svc_name):
         self._parent_servicename = parent_svc_name
-        self._groupnames = []
+        self._groupnames = OrderedDict()
 
     def get_parent_service_name(self):
         return self._parent_servicename
 
     def get_vars(self):
-        return self.vars.copy()
+        return self._vars.copy()
 
 
 class Inventory(object):
@@ -265,17 +356,65 @@ class Inventory(object):
         self._create_default_inventory()
 
     def upgrade(self):
+        """upgrade the inventory to the current class version
+
+        return True if a migration changed the inventory, in which case
+        the caller needs to save it.
+        """
+        upgraded = False
         if self.version <= 1:
-            # upgrade from v1
+            # upgrade from v1, nothing to migrate yet
             pass
 
-        # update the version and save upgraded inventory file
         self.version = self.__class__.class_version
-        Inventory.save(self)
+        return upgraded
+
+    def to_dict(self):
+        return {
+            '_groups': dict((name, group.to_dict())
+                            for name, group in self._groups.items()),
+            '_hosts': dict((name, host.to_dict())
+                           for name, host in self._hosts.items()),
+            '_services': dict((name, svc.to_dict())
+                              for name, svc in self._services.items()),
+            '_sub_services': dict((name, sub_svc.to_dict())
+                                  for name, sub_svc
+                                  in self._sub_services.items()),
+            'vars': self.vars,
+            'version': self.version,
+            'remote_mode': self.remote_mode,
+            }
+
+    @classmethod
+    def from_dict(cls, inv_dict):
+        """create an inventory from its dict form
+
+        Unknown keys, like the py/object tags written by older jsonpickle
+        based versions of the inventory file, are ignored.
+        """
+        # skip __init__, the default inventory is replaced by the saved one
+        inventory = cls.__new__(cls)
+        inventory._groups = dict(
+            (name, HostGroup.from_dict(group))
+            for name, group in inv_dict.get('_groups', {}).items())
+        inventory._hosts = dict(
+            (name, Host.from_dict(host))
+            for name, host in inv_dict.get('_hosts', {}).items())
+        inventory._services = dict(
+            (name, Service.from_dict(svc))
+            for name, svc in inv_dict.get('_services', {}).items())
+        inventory._sub_services = dict(
+            (name, SubService.from_dict(sub_svc))
+            for name, sub_svc in inv_dict.get('_sub_services', {}).items())
+        inventory.vars = inv_dict.get('vars', {})
+        inventory.version = inv_dict.get('version', 1)
+        inventory.remote_mode = inv_dict.get('remote_mode', True)
+
+        return inventory
 
     @staticmethod
     def load():
-        """load the inventory from a pickle file"""
+        """load the inventory from a json file"""
         inventory_path = os.path.join(utils.get_kollacli_etc(), INVENTORY_PATH)
         data = ''
         try:
@@ -283,28 +422,30 @@ class Inventory(object):
                 data = utils.sync_read_file(inventory_path)
 
             if data.strip():
-                inventory = jsonpickle.decode(data)
+                inventory = Inventory.from_dict(json.loads(data))
 
                 # upgrade version handling
                 if inventory.version != inventory.class_version:
-                    inventory.upgrade()
+                    if inventory.upgrade():
+                        Inventory.save(inventory)
             else:
                 inventory = Inventory()
         except Exception:
+            # imported here, it is only needed on this error path
+            import traceback
             raise CommandError('loading inventory failed: %s'
                                % traceback.format_exc())
         return inventory
 
     @staticmethod
     def save(inventory):
-        """Save the inventory in a pickle file"""
+        """Save the inventory in a json file"""
         inventory_path = os.path.join(utils.get_kollacli_etc(), INVENTORY_PATH)
         try:
-            # multiple trips thru json to render a readable inventory file
-            data = jsonpickle.encode(inventory)
-            data_str = json.loads(data)
-            pretty_data = json.dumps(data_str, indent=4)
-            utils.sync_write_file(inventory_path, pretty_data)
+            # encode before the file is opened (and truncated), so an
+            # encoding error cannot leave a partial inventory behind
+            inv_data = json.dumps(inventory.to_dict(), indent=4)
+            utils.sync_write_file(inventory_path, inv_data)
 
         except Exception as e:
             raise CommandError('saving inventory failed: %s' % e)
@@ -361,16 +502,15 @@ class Inventory(object):
                                'local deploy mode')
 
         # create new host if it doesn't exist
-        host = Host(hostname)
-        if hostname not in self.get_hostnames():
+        if hostname not in self._hosts:
             # a new host is being added to the inventory
-            self._hosts[hostname] = host
+            self._hosts[hostname] = Host(hostname)
 
         # a host is to be added to an existing group
         elif groupname:
             group = self._groups[groupname]
-            if hostname not in group.get_hostnames():
-                group.add_host(host)
+            if hostname not in group.hostnames:
+                group.add_host(self._hosts[hostname])
 
     def remove_host(self, hostname, groupname=None):
         """remove host
@@ -406,6 +546,7 @@ class Inventory(object):
         The uname entry is optional.
         """
         failed_hosts = {}
+        setup_args = {}
         for hostname, host_info in hosts_info.items():
             host = self.get_host(hostname)
             if not host:
@@ -418,10 +559,29 @@ class Inventory(object):
             uname = None
             if 'uname' in host_info:
                 uname = host_info['uname']
+            setup_args[hostname] = (passwd, uname)
+
+        if setup_args:
+            # render the ansible inventory once, the post setup checks
+            # of all the hosts then share the json generator file.
+            gen_file_path = self.create_json_gen_file()
             try:
-                self.setup_host(hostname, passwd, uname)
-            except Exception as e:
-                failed_hosts[hostname] = '%s' % e
+                # the setup of each host is independent ssh and ansible
+                # work, so the hosts are set up concurrently.
+                max_workers = min(MAX_SETUP_WORKERS, len(setup_args))
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    futures = dict(
+                        (executor.submit(self.setup_host, hostname,
+                                         passwd, uname, gen_file_path),
+                         hostname)
+                        for hostname, (passwd, uname) in setup_args.items())
+                    for future in as_completed(futures):
+                        try:
+                            future.result()
+                        except Exception as e:
+                            failed_hosts[futures[future]] = '%s' % e
+            finally:
+                os.remove(gen_file_path)
         if failed_hosts:
             summary = '\n'
             for hostname, err in failed_hosts.items():
@@ -430,12 +590,13 @@ class Inventory(object):
         else:
             self.log.info('All hosts were successfully set up')
 
-    def setup_host(self, hostname, password, uname=None):
+    def setup_host(self, hostname, password, uname=None,
+                   gen_file_path=None):
         try:
             self.log.info('Starting setup of host (%s)'
                           % hostname)
             ssh_setup_host(hostname, password, uname)
-            check_ok = self.check_host(hostname, True)
+            check_ok = self.check_host(hostname, True, gen_file_path)
             if not check_ok:
                 raise Exception('Post setup check failed')
             self.log.info('Host (%s) setup succeeded' % hostname)
@@ -445,9 +606,17 @@ class Inventory(object):
                 % (hostname, e))
         return True
 
-    def check_host(self, hostname, result_only=False):
+    def check_host(self, hostname, result_only=False, gen_file_path=None):
+        """check that ansible can reach the host
+
+        gen_file_path is a json generator file from create_json_gen_file
+        to use, for callers that check several hosts. Without it, one is
+        created (and removed again) for this check.
+        """
         command_string = '/usr/bin/sudo -u %s ansible ' % get_admin_user()
-        gen_file_path = self.create_json_gen_file()
+        own_gen_file = not gen_file_path
+        if own_gen_file:
+            gen_file_path = self.create_json_gen_file()
         err_msg = None
         output = None
         try:
@@ -458,7 +627,7 @@ class Inventory(object):
         except Exception as e:
             raise e
         finally:
-            if gen_file_path:
+            if own_gen_file:
                 os.remove(gen_file_path)
         if err_msg:
             if result_only:
@@ -473,7 +642,6 @@ class Inventory(object):
         return True
 
     def add_group(self, groupname):
-
         # Group names cannot overlap with service names:
         if groupname in self._services or groupname in self._sub_services:
             raise CommandError('Invalid group name. A service name '
@@ -522,20 +690,22 @@ class Inventory(object):
             groups = self._groups.values()
 
         else:
-            for group in self._groups.values():
-                if host.name in group.get_hostnames():
-                    groups.append(group)
+            # group hostnames are ordered sets, so each test is O(1)
+            groups = [group for group in self._groups.values()
+                      if host.name in group.hostnames]
         return groups
 
     def get_host_groups(self):
         """return { hostname : groupnames }"""
-
-        host_groups = {}
-        for host in self._hosts.values():
-            host_groups[host.name] = []
-            groups = self.get_groups(host)
-            for group in groups:
-                host_groups[host.name].append(group.name)
+        # one pass over the group memberships rather than a search of
+        # all groups for each host
+        host_groups = dict((hostname, []) for hostname in self._hosts)
+        for group in self._groups.values():
+            for hostname in group.hostnames:
+                if hostname in host_groups:
+                    host_groups[hostname].append(group.name)
+        for groupnames in host_groups.values():
+            groupnames.sort()
         return host_groups
 
     def get_group_services(self):
@@ -544,27 +714,21 @@ class Inventory(object):
         return { groupname: [servicenames] }
         """
 
-        group_services = {}
+        group_services = dict((groupname, [])
+                              for groupname in self._groups)
 
-        for group in self.get_groups():
-            group_services[group.name] = []
-
-        for svc in self.get_services():
-            for groupname in svc.get_groupnames():
+        for svc in self._services.values():
+            for groupname in svc._groupnames:
                 group_services[groupname].append(svc.name)
-        for sub_svc in self.get_sub_services():
-            for groupname in sub_svc.get_groupnames():
+        for sub_svc in self._sub_services.values():
+            for groupname in sub_svc._groupnames:
                 group_services[groupname].append(sub_svc.name)
         return group_services
 
     def get_group_hosts(self):
         """return { groupname : [hostnames] }"""
-        group_hosts = {}
-        for group in self.get_groups():
-            group_hosts[group.name] = []
-            for hostname in group.get_hostnames():
-                group_hosts[group.name].append(hostname)
-        return group_hosts
+        return dict((group.name, list(group.hostnames))
+                    for group in self._groups.values())
 
     def create_service(self, servicename):
         if servicename not in self._services:
@@ -661,8 +825,9 @@ class Inventory(object):
                                'hosts exist')
         self.remote_mode = remote_flag
 
-        for group in self.get_groups():
-            group.set_remote(remote_flag)
+        admin_user = utils.get_admin_user()
+        for group in self._groups.values():
+            group.set_remote(remote_flag, admin_user)
 
     def get_ansible_json(self, inventory_filter=None):
         """generate json inventory for ansible
@@ -708,77 +873,74 @@ class Inventory(object):
                 deploy_hostnames = inventory_filter['deploy_hosts']
             if 'deploy_groups' in inventory_filter:
                 deploy_groupnames = inventory_filter['deploy_groups']
-
-        # add hostgroups
-        for group in self.get_groups():
-            jdict[group.name] = {}
-            jdict[group.name]['hosts'] = []
-
+        deploy_hostnames = list(deploy_hostnames)
+        deploy_hostnames_set = set(deploy_hostnames)
+        deploy_groupnames = set(deploy_groupnames)
+
+        # add hostgroups. the vars are not copied, the json is rendered
+        # before this method returns.
+        for group in self._groups.values():
+            hostnames = []
             if group.name in deploy_groupnames:
-                jdict[group.name]['hosts'] = \
-                    self._filter_hosts(group.get_hostnames(), deploy_hostnames)
-            jdict[group.name]['children'] = []
-            jdict[group.name]['vars'] = group.get_vars()
+                hostnames = [hostname for hostname in group.hostnames
+                             if hostname in deploy_hostnames_set]
+            jdict[group.name] = {'hosts': hostnames,
+                                 'children': [],
+                                 'vars': group.vars}
 
         # add top-level services and what groups they are in
-        for service in self.get_services():
-            jdict[service.name] = {}
-            jdict[service.name]['children'] = service.get_groupnames()
+        for service in self._services.values():
+            jdict[service.name] = {'children': list(service._groupnames)}
 
         # add sub-services and their groups
-        for sub_svc in self.get_sub_services():
-            jdict[sub_svc.name] = {}
-            groupnames = sub_svc.get_groupnames()
-            if groupnames:
+        for sub_svc in self._sub_services.values():
+            if sub_svc._groupnames:
                 # sub-service is associated with a group(s)
-                jdict[sub_svc.name]['children'] = groupnames
+                children = list(sub_svc._groupnames)
             else:
                 # sub-service is associated with parent service
-                jdict[sub_svc.name]['children'] = \
-                    [sub_svc.get_parent_service_name()]
+                children = [sub_svc.get_parent_service_name()]
+            jdict[sub_svc.name] = {'children': children}
 
-        # temporarily create group containing all hosts. this is needed for
+        # add a group containing all hosts. this is needed for
         # ansible commands that are performed on hosts not yet in groups.
-        group = self.add_group('__RESERVED__')
-        jdict[group.name] = {}
-        jdict[group.name]['hosts'] = deploy_hostnames
-        jdict[group.name]['vars'] = group.get_vars()
-        self.remove_group(group.name)
+        jdict['__RESERVED__'] = {
+            'hosts': deploy_hostnames,
+            'vars': _remote_vars(self.remote_mode),
+            'children': [],
+            }
 
         # process hosts vars
-        jdict['_meta'] = {}
-        jdict['_meta']['hostvars'] = {}
+        hostvars = {}
         for hostname in deploy_hostnames:
-            host = self.get_host(hostname)
+            host = self._hosts.get(hostname)
             if host:
-                jdict['_meta']['hostvars'][hostname] = host.get_vars()
+                hostvars[hostname] = host.vars
+        jdict['_meta'] = {'hostvars': hostvars}
         return json.dumps(jdict)
 
-    def _filter_hosts(self, initial_hostnames, deploy_hostnames):
-        """filter out hosts not in deploy hosts"""
-        filtered_hostnames = []
-        for hostname in deploy_hostnames:
-            if hostname in initial_hostnames:
-                filtered_hostnames.append(hostname)
-        return filtered_hostnames
-
     def create_json_gen_file(self, inventory_filter=None):
         """create json inventory file using filter ({})
 
         return path to filtered json generator file
         """
-        json_out = self.get_ansible_json(inventory_filter)
+        import tempfile
 
-        fd, json_gen_path = tempfile.mkstemp(prefix='kollacli_json_gen_',
-                                             suffix='.py')
-        os.close(fd)  # avoid fd leak
+        json_out = self.get_ansible_json(inventory_filter)
 
-        with open(json_gen_path, 'w') as json_gen_file:
-            json_gen_file.write('#!/usr/bin/env python\n')
-            # the quotes here are significant. The json_out has double quotes
-            # embedded in it so single quotes are needed to wrap it.
-            json_gen_file.write("print('%s')" % json_out)
+        # the json is emitted by a quoted here-document, so the shell copies
+        # it byte for byte without any quoting or expansion. json_out is a
+        # single line so it cannot contain the terminating delimiter line.
+        json_gen = ('#!/bin/sh\n'
+                    'cat <<\'%s\'\n%s\n%s\n'
+                    % (JSON_GEN_EOF, json_out, JSON_GEN_EOF))
 
-        # set executable by group
-        os.chmod(json_gen_path, 0o555)
+        # write the script through the mkstemp fd rather than re-opening
+        # it. the file object's write loops until all the data is written.
+        fd, json_gen_path = tempfile.mkstemp(prefix='kollacli_json_gen_',
+                                             suffix='.sh')
+        with os.fdopen(fd, 'wb') as json_gen_file:
+            json_gen_file.write(json_gen.encode('utf-8'))
+            # set executable by group
+            os.fchmod(json_gen_file.fileno(), 0o555)
         return json_gen_path
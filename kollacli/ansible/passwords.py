@@ -11,7 +11,9 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import json
 import os
+import subprocess
 
 from kollacli.exceptions import CommandError
 from kollacli import utils
@@ -32,6 +34,29 @@ def set_password(pwd_key, pwd_value):
         raise CommandError('%s %s' % (err_msg, output))
 
 
+def set_passwords(passwords):
+    """set multiple password values
+
+    passwords is a dict of { password name: password value }. The
+    passwords are handed to the password editor in one call, so the
+    passwords file is read and written once for the whole batch.
+    """
+    # stdin carries the passwords, so sudo must not prompt for its own
+    # password (-n); it fails instead, like run_cmd's prompt check
+    cmd = '%s -b' % _get_cmd_prefix(non_interactive=True)
+    editor = subprocess.Popen(cmd.split(), stdin=subprocess.PIPE,
+                              stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT,
+                              universal_newlines=True)
+    output, _ = editor.communicate(json.dumps(passwords))
+    if editor.returncode != 0:
+        err_msg = 'Command Failed'
+        if 'password is required' in output:
+            err_msg = ('%s Insufficient permissions to run command "%s"'
+                       % (err_msg, cmd))
+        raise CommandError('%s %s' % (err_msg, output))
+
+
 def clear_password(pwd_key):
     """clear a password
 
@@ -56,13 +81,14 @@ def get_password_names():
     return pwd_names
 
 
-def _get_cmd_prefix():
+def _get_cmd_prefix(non_interactive=False):
     editor_path = os.path.join(utils.get_kollacli_home(),
                                'tools',
                                PWD_EDITOR_FILENAME)
     pwd_file_path = os.path.join(utils.get_kolla_etc(),
                                  PWDS_FILENAME)
     user = utils.get_admin_user()
-    prefix = '/usr/bin/sudo -u %s %s -p %s ' % (user,
-                                                editor_path, pwd_file_path)
+    sudo = '/usr/bin/sudo -n' if non_interactive else '/usr/bin/sudo'
+    prefix = '%s -u %s %s -p %s ' % (sudo, user,
+                                     editor_path, pwd_file_path)
     return prefix
@@ -13,6 +13,7 @@
 #    under the License.
 import logging
 import os
+import stat
 import yaml
 
 from kollacli.utils import change_property
@@ -25,11 +26,55 @@ GLOBALS_FILENAME = 'globals.yml'
 ANSIBLE_ROLES_PATH = 'ansible/roles'
 ANSIBLE_DEFAULTS_PATH = 'defaults/main.yml'
 
+# last loaded property values, keyed on the property file stats
+_property_values_cache = {}
+
+
+def get_property_values():
+    """return { property name: property value } of all ansible properties
+
+    The values are cached on the paths, mtimes and sizes of the property
+    files, so a process that runs several commands (e.g. the kollacli
+    shell) only parses the yaml files again after one of them changed.
+    """
+    kolla_home = get_kolla_home()
+    role_files = _get_role_files(kolla_home)
+    file_stamps = [(path, file_stat.st_mtime, file_stat.st_size)
+                   for _, path, file_stat in role_files]
+    for path in (os.path.join(kolla_home, ALLVARS_PATH),
+                 os.path.join(get_kolla_etc(), GLOBALS_FILENAME)):
+        file_stat = os.stat(path)
+        file_stamps.append((path, file_stat.st_mtime, file_stat.st_size))
+    file_stamps = tuple(file_stamps)
+    if _property_values_cache.get('file_stamps') != file_stamps:
+        properties = AnsibleProperties(role_files)
+        _property_values_cache['values'] = dict(
+            (name, prop.value)
+            for name, prop in properties.unique_properties.items())
+        _property_values_cache['file_stamps'] = file_stamps
+    return dict(_property_values_cache['values'])
+
+
+def _get_role_files(kolla_home):
+    """return [(service name, path, stat)] of the role defaults files"""
+    role_files = []
+    start_dir = os.path.join(kolla_home, ANSIBLE_ROLES_PATH)
+    for service_name in sorted(next(os.walk(start_dir))[1]):
+        file_name = os.path.join(start_dir, service_name,
+                                 ANSIBLE_DEFAULTS_PATH)
+        try:
+            file_stat = os.stat(file_name)
+        except OSError:
+            continue
+        if stat.S_ISREG(file_stat.st_mode):
+            role_files.append((service_name, file_name, file_stat))
+    return role_files
+
 
 class AnsibleProperties(object):
     log = logging.getLogger(__name__)
 
-    def __init__(self):
+    def __init__(self, role_files=None):
         """initialize ansible property information
 
         property information is pulled from the following files:
@@ -37,6 +82,9 @@ class AnsibleProperties(object):
         KOLLA_ETC/passwords.yml
         KOLLA_HOME/group_vars/all.yml
         KOLLA_HOME/ansible/roles/<service>/default/main.yml
+
+        role_files is the _get_role_files() list of the role defaults
+        files, if the caller already has it.
         """
         kolla_etc = get_kolla_etc()
         kolla_home = get_kolla_home()
@@ -51,22 +99,19 @@ class AnsibleProperties(object):
         self.file_contents = {}
 
         try:
-            start_dir = os.path.join(kolla_home, ANSIBLE_ROLES_PATH)
-            services = next(os.walk(start_dir))[1]
-            for service_name in services:
-                file_name = os.path.join(start_dir, service_name,
-                                         ANSIBLE_DEFAULTS_PATH)
-                if os.path.isfile(file_name):
-                    with open(file_name) as service_file:
-                        service_contents = yaml.load(service_file)
-                        self.file_contents[file_name] = service_contents
-                        service_contents = self.filter_jinja2(service_contents)
-                        prop_file_name = service_name + ':main.yml'
-                        for key, value in service_contents.items():
-                            ansible_property = AnsibleProperty(key, value,
-                                                               prop_file_name)
-                            self.properties.append(ansible_property)
-                            self.unique_properties[key] = ansible_property
+            if role_files is None:
+                role_files = _get_role_files(kolla_home)
+            for service_name, file_name, _ in role_files:
+                with open(file_name) as service_file:
+                    service_contents = yaml.load(service_file)
+                    self.file_contents[file_name] = service_contents
+                    service_contents = self.filter_jinja2(service_contents)
+                    prop_file_name = service_name + ':main.yml'
+                    for key, value in service_contents.items():
+                        ansible_property = AnsibleProperty(key, value,
+                                                           prop_file_name)
+                        self.properties.append(ansible_property)
+                        self.unique_properties[key] = ansible_property
         except Exception as e:
             raise e
 
@@ -11,15 +11,27 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import copy
+import errno
+import gzip
 import logging
 import os
+import shutil
+import subprocess
 import tarfile
 import tempfile
-import traceback
+
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from shutil import which as find_executable
+except ImportError:
+    # python 2, where shutil has no which()
+    from distutils.spawn import find_executable
 
 from kollacli.ansible.inventory import Inventory
 from kollacli.ansible.playbook import AnsiblePlaybook
-from kollacli.ansible.properties import AnsibleProperties
+from kollacli.ansible.properties import get_property_values
 from kollacli.exceptions import CommandError
 from kollacli.utils import convert_to_unicode
 from kollacli.utils import get_kolla_etc
@@ -27,9 +39,60 @@ from kollacli.utils import get_kolla_home
 from kollacli.utils import get_kolla_log_dir
 from kollacli.utils import get_kollacli_etc
 from kollacli.utils import run_cmd
+from kollacli.utils import WRITE_BUFFER_SIZE
 
 from cliff.command import Command
 
+DUMP_COMPRESS_LEVEL = 6
+
+# chunk size for writing the dump archive and copying files into it,
+# large enough that the pigz pipe sees few, big writes
+DUMP_BUFSIZE = WRITE_BUFFER_SIZE
+
+# files copied into the dump, as (path relative to the kolla
+# home or etc dir, name in the archive)
+DUMP_SHARE_FILES = (('ansible', 'kolla/share/ansible'),
+                    ('docs', 'kolla/share/docs'))
+DUMP_ETC_ARCDIR = 'kolla/etc/'
+DUMP_ETC_FILES = (('config', DUMP_ETC_ARCDIR + 'config'),
+                  ('globals.yml', DUMP_ETC_ARCDIR + 'globals.yml'))
+
+
+def _parse_csv(arg, arg_name):
+    """split a comma separated argument into a list of names
+
+    Whitespace around each name is stripped and empty entries (e.g. from
+    a trailing comma) are dropped. None is returned if the argument was
+    not given. If it was given but holds no names, that is an error
+    rather than no restriction at all.
+    """
+    if not arg:
+        return None
+    names = [name.strip() for name in convert_to_unicode(arg).split(',')
+             if name.strip()]
+    if not names:
+        raise CommandError('No names given in the %s list.' % arg_name)
+    return names
+
+
+def _find_files(path, names):
+    """return the subset of names that are regular files in dir path
+
+    The directory is read once. os.scandir gets each entry's type with
+    the listing, so no file is stat'ed; python 2 has no scandir and
+    falls back to an isfile check of the matching names.
+    """
+    try:
+        if hasattr(os, 'scandir'):
+            return set(entry.name for entry in os.scandir(path)
+                       if entry.name in names and entry.is_file())
+        return set(name for name in os.listdir(path)
+                   if name in names and
+                   os.path.isfile(os.path.join(path, name)))
+    except OSError:
+        # missing directory
+        return set()
+
 
 class Deploy(Command):
     """Deploy"""
@@ -52,58 +115,41 @@ class Deploy(Command):
         return parser
 
     def take_action(self, parsed_args):
-        try:
-            if parsed_args.hosts and parsed_args.groups:
-                raise CommandError('Hosts and Groups arguments cannot both ' +
-                                   'be present at the same time.')
-
-            self._run_rules()
-
-            playbook = AnsiblePlaybook()
-            kolla_home = get_kolla_home()
-            playbook.playbook_path = os.path.join(kolla_home,
-                                                  'ansible/site.yml')
-            if parsed_args.hosts:
-                host_list = parsed_args.hosts.strip()
-                host_list = convert_to_unicode(host_list)
-                playbook.hosts = host_list.split(',')
-            if parsed_args.groups:
-                group_list = parsed_args.groups.strip()
-                group_list = convert_to_unicode(group_list)
-                playbook.groups = group_list.split(',')
-            if parsed_args.services:
-                tag_list = parsed_args.services.strip()
-                tag_list = convert_to_unicode(tag_list)
-                playbook.services = tag_list.split(',')
-            if parsed_args.serial:
-                playbook.serial = True
-
-            playbook.verbose_level = self.app.options.verbose_level
-            playbook.run()
-        except CommandError as e:
-            raise e
-        except Exception:
-            raise Exception(traceback.format_exc())
+        if parsed_args.hosts and parsed_args.groups:
+            raise CommandError('Hosts and Groups arguments cannot both ' +
+                               'be present at the same time.')
+
+        self._run_rules()
+
+        playbook = AnsiblePlaybook()
+        kolla_home = get_kolla_home()
+        playbook.playbook_path = os.path.join(kolla_home,
+                                              'ansible/site.yml')
+        playbook.hosts = _parse_csv(parsed_args.hosts, 'hosts')
+        playbook.groups = _parse_csv(parsed_args.groups, 'groups')
+        playbook.services = _parse_csv(parsed_args.services, 'services')
+        if parsed_args.serial:
+            playbook.serial = True
+
+        playbook.verbose_level = self.app.options.verbose_level
+        playbook.run()
 
     def _run_rules(self):
         # check that ring files are in /etc/kolla/config/swift if
         # swift is enabled
-        expected_files = ['account.ring.gz',
-                          'container.ring.gz',
-                          'object.ring.gz']
-        properties = AnsibleProperties()
-        is_enabled = properties.get_property('enable_swift')
+        expected_files = set(['account.ring.gz',
+                              'container.ring.gz',
+                              'object.ring.gz'])
+        is_enabled = get_property_values().get('enable_swift')
         if is_enabled == 'yes':
             path_pre = os.path.join(get_kolla_etc(), 'config', 'swift')
-            for expected_file in expected_files:
-                path = os.path.join(path_pre, expected_file)
-                if not os.path.isfile(path):
-                    msg = ('Deploy failed. ' +
-                           'Swift is enabled but ring buffers have ' +
-                           'not yet been set up. Please see the ' +
-                           'documentation for swift configuration ' +
-                           'instructions.')
-                    raise CommandError(msg)
+            if expected_files - _find_files(path_pre, expected_files):
+                msg = ('Deploy failed. ' +
+                       'Swift is enabled but ring buffers have ' +
+                       'not yet been set up. Please see the ' +
+                       'documentation for swift configuration ' +
+                       'instructions.')
+                raise CommandError(msg)
 
 
 class Dump(Command):
@@ -116,47 +162,51 @@ class Dump(Command):
     log = logging.getLogger(__name__)
 
     def take_action(self, parsed_args):
-        try:
-            kolla_home = get_kolla_home()
-            kolla_logs = get_kolla_log_dir()
-            kolla_ansible = os.path.join(kolla_home, 'ansible')
-            kolla_docs = os.path.join(kolla_home, 'docs')
-            kolla_etc = get_kolla_etc()
-            kolla_config = os.path.join(kolla_etc, 'config')
-            kolla_globals = os.path.join(kolla_etc, 'globals.yml')
-            kollacli_etc = get_kollacli_etc().rstrip('/')
-            ketc = 'kolla/etc/'
-            kshare = 'kolla/share/'
-            fd, dump_path = tempfile.mkstemp(prefix='kollacli_dump_',
-                                             suffix='.tgz')
-            os.close(fd)  # avoid fd leak
-            with tarfile.open(dump_path, 'w:gz') as tar:
-                # Can't blanket add kolla_home because the .ssh dir is
-                # accessible by the kolla user only (not kolla group)
-                tar.add(kolla_ansible,
-                        arcname=kshare + os.path.basename(kolla_ansible))
-                tar.add(kolla_docs,
-                        arcname=kshare + os.path.basename(kolla_docs))
-
-                # Can't blanket add kolla_etc because the passwords.yml
-                # file is accessible by the kolla user only (not kolla group)
-                tar.add(kolla_config,
-                        arcname=ketc + os.path.basename(kolla_config))
-                tar.add(kolla_globals,
-                        arcname=ketc + os.path.basename(kolla_globals))
-                tar.add(kollacli_etc,
-                        arcname=ketc + os.path.basename(kollacli_etc))
-
-                # add kolla log files
-                if os.path.isdir(kolla_logs):
-                    tar.add(kolla_logs)
-
-                # add output of various commands
-                self._add_cmd_info(tar)
-
-            self.log.info('dump successful to %s' % dump_path)
-        except Exception:
-            raise Exception(traceback.format_exc())
+        with tempfile.NamedTemporaryFile('wb', WRITE_BUFFER_SIZE,
+                                         prefix='kollacli_dump_',
+                                         suffix='.tgz',
+                                         delete=False) as dump_file:
+            dump_path = dump_file.name
+            gz_stream, pigz = _open_gzip_stream(dump_file)
+            try:
+                with _DumpTarFile.open(fileobj=gz_stream, mode='w') as tar:
+                    self._add_kolla_files(tar)
+
+                    # add output of various commands
+                    self._add_cmd_info(tar)
+
+                    # add kolla log files, this has to come last
+                    self._add_kolla_logs(tar)
+            finally:
+                _close_gzip_stream(gz_stream, pigz)
+
+        self.log.info('dump successful to %s' % dump_path)
+
+    def _add_kolla_files(self, tar):
+        # Can't blanket add kolla_home because the .ssh dir is
+        # accessible by the kolla user only (not kolla group)
+        kolla_home = get_kolla_home()
+        for name, arcname in DUMP_SHARE_FILES:
+            tar.add(os.path.join(kolla_home, name), arcname=arcname)
+
+        # Can't blanket add kolla_etc because the passwords.yml
+        # file is accessible by the kolla user only (not kolla group)
+        kolla_etc = get_kolla_etc()
+        for name, arcname in DUMP_ETC_FILES:
+            tar.add(os.path.join(kolla_etc, name), arcname=arcname)
+        kollacli_etc = get_kollacli_etc().rstrip('/')
+        tar.add(kollacli_etc,
+                arcname=DUMP_ETC_ARCDIR + os.path.basename(kollacli_etc))
+
+    def _add_kolla_logs(self, tar):
+        kolla_logs = get_kolla_log_dir()
+        if not os.path.isdir(kolla_logs):
+            return
+        tar_path = find_executable('tar')
+        if tar_path:
+            tar.append_tree(tar_path, kolla_logs)
+        else:
+            tar.add(kolla_logs)
 
     def _add_cmd_info(self, tar):
         # run all the kollacli list commands
@@ -173,18 +223,26 @@ class Dump(Command):
         inv_path = inventory.create_json_gen_file()
         cmds.append(inv_path)
 
+        path = None
         try:
-            fd, path = tempfile.mkstemp(suffix='.tmp')
-            os.close(fd)
-            with open(path, 'w') as tmp_file:
-                for cmd in cmds:
-                    err_msg, output = run_cmd(cmd, False)
-                    tmp_file.write('\n\n$ %s\n' % cmd)
-                    if err_msg:
-                        tmp_file.write('Error message: %s\n' % err_msg)
-                    lines = output.split('\n')
-                    for line in lines:
-                        tmp_file.write(line + '\n')
+            # each command is a separate process, so run them all at once
+            with ThreadPoolExecutor(max_workers=len(cmds)) as executor:
+                results = list(executor.map(
+                    lambda cmd: run_cmd(cmd, False), cmds))
+
+            cmds_output = []
+            for cmd, (err_msg, output) in zip(cmds, results):
+                cmds_output.append('\n\n$ %s\n' % cmd)
+                if err_msg:
+                    cmds_output.append('Error message: %s\n' % err_msg)
+                if not output.endswith('\n'):
+                    output += '\n'
+                cmds_output.append(output)
+            with tempfile.NamedTemporaryFile('w', WRITE_BUFFER_SIZE,
+                                             suffix='.tmp',
+                                             delete=False) as tmp_file:
+                path = tmp_file.name
+                tmp_file.writelines(cmds_output)
             tar.add(path, arcname=os.path.join('kolla', 'cmds_output'))
 
         except Exception as e:
@@ -197,6 +255,168 @@ class Dump(Command):
         return
 
 
+class _PipeWriter(object):
+    """file object for writing a tar archive into a pipe
+
+    tarfile needs tell() on the file object it writes to, which a pipe
+    does not support, so the position is tracked here. Writes are
+    buffered and sendfile() copies file data straight into the pipe.
+    """
+
+    def __init__(self, pipe, bufsize=DUMP_BUFSIZE):
+        self._pipe = pipe
+        self._bufsize = bufsize
+        self._buf = []
+        self._buf_len = 0
+        self._pos = 0
+
+    def write(self, data):
+        self._buf.append(data)
+        self._buf_len += len(data)
+        self._pos += len(data)
+        if self._buf_len >= self._bufsize:
+            self.flush()
+
+    def flush(self):
+        if self._buf:
+            self._pipe.write(b''.join(self._buf))
+            self._buf = []
+            self._buf_len = 0
+        self._pipe.flush()
+
+    def tell(self):
+        return self._pos
+
+    def fileno(self):
+        return self._pipe.fileno()
+
+    def sendfile(self, src_file, count):
+        """copy count bytes of src_file into the pipe
+
+        os.sendfile lets the kernel do the copy. It is not available on
+        python 2, and some files (e.g. in /proc) do not support it, in
+        which case the data is copied in DUMP_BUFSIZE chunks.
+        """
+        self.flush()
+        offset = src_file.tell()
+        remaining = count
+        if hasattr(os, 'sendfile'):
+            out_fd = self._pipe.fileno()
+            in_fd = src_file.fileno()
+            try:
+                while remaining:
+                    sent = os.sendfile(out_fd, in_fd, offset, remaining)
+                    if not sent:
+                        raise IOError('unexpected end of data in %s'
+                                      % src_file.name)
+                    offset += sent
+                    remaining -= sent
+            except OSError as e:
+                if (e.errno not in (errno.EINVAL, errno.ENOSYS) or
+                        remaining != count):
+                    raise
+        if remaining:
+            src_file.seek(offset)
+            while remaining:
+                data = src_file.read(min(remaining, self._bufsize))
+                if not data:
+                    raise IOError('unexpected end of data in %s'
+                                  % src_file.name)
+                self._pipe.write(data)
+                remaining -= len(data)
+        self._pos += count
+
+    def close(self):
+        self.flush()
+        self._pipe.close()
+
+
+class _DumpTarFile(tarfile.TarFile):
+    """tar file for the dump archive
+
+    When the archive is written into the pigz pipe, regular file data
+    is sent to the pipe with sendfile. Otherwise member data is copied
+    in DUMP_BUFSIZE chunks on python 3.8+, where tarfile takes its copy
+    buffer size from copybufsize; older versions use a fixed size.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(_DumpTarFile, self).__init__(*args, **kwargs)
+        # TarFile.__init__ sets copybufsize (None: tarfile's default)
+        self.copybufsize = DUMP_BUFSIZE
+
+    def addfile(self, tarinfo, fileobj=None):
+        if (fileobj is None or not tarinfo.isreg() or
+                not isinstance(self.fileobj, _PipeWriter)):
+            return super(_DumpTarFile, self).addfile(tarinfo, fileobj)
+
+        tarinfo = copy.copy(tarinfo)
+        buf = tarinfo.tobuf(self.format, self.encoding, self.errors)
+        self.fileobj.write(buf)
+        self.offset += len(buf)
+
+        self.fileobj.sendfile(fileobj, tarinfo.size)
+        blocks, remainder = divmod(tarinfo.size, tarfile.BLOCKSIZE)
+        if remainder > 0:
+            self.fileobj.write(tarfile.NUL *
+                               (tarfile.BLOCKSIZE - remainder))
+            blocks += 1
+        self.offset += blocks * tarfile.BLOCKSIZE
+        self.members.append(tarinfo)
+
+    def append_tree(self, tar_path, path):
+        """add a directory tree at the end of the archive with gnu tar
+
+        gnu tar walks and reads a large tree (like the kolla logs) much
+        faster than tarfile. Its output, end-of-archive blocks included,
+        becomes the rest of this archive, so this archive is closed
+        without writing its own and nothing can be added after it.
+        """
+        self.closed = True
+        # same member names as tarfile would use: the path without the
+        # leading /
+        cmd = [tar_path, '-cf', '-', '-C', os.sep, path.lstrip(os.sep)]
+        if isinstance(self.fileobj, _PipeWriter):
+            # gnu tar writes straight into the pigz pipe
+            self.fileobj.flush()
+            gnu_tar = subprocess.Popen(cmd, stdout=self.fileobj.fileno())
+        else:
+            gnu_tar = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+            shutil.copyfileobj(gnu_tar.stdout, self.fileobj, DUMP_BUFSIZE)
+            gnu_tar.stdout.close()
+        # exit code 1 means some files changed while being read, which is
+        # expected for log files that are still being written.
+        if gnu_tar.wait() not in (0, 1):
+            raise CommandError('Archiving %s failed, ' % path +
+                               'tar exit code: %s' % gnu_tar.returncode)
+
+
+def _open_gzip_stream(dump_file):
+    """open a gzip stream that compresses into dump_file
+
+    If pigz is installed, the compression is done by a pigz process,
+    outside of the python interpreter and on all cpus. Otherwise the
+    python gzip module is used.
+
+    return (gzip stream, pigz process or None)
+    """
+    pigz_path = find_executable('pigz')
+    if pigz_path:
+        pigz = subprocess.Popen([pigz_path, '-%d' % DUMP_COMPRESS_LEVEL],
+                                stdin=subprocess.PIPE, stdout=dump_file)
+        return _PipeWriter(pigz.stdin), pigz
+    gz_stream = gzip.GzipFile(fileobj=dump_file, mode='wb',
+                              compresslevel=DUMP_COMPRESS_LEVEL)
+    return gz_stream, None
+
+
+def _close_gzip_stream(gz_stream, pigz):
+    gz_stream.close()
+    if pigz and pigz.wait() != 0:
+        raise CommandError('Compression of the dump file failed, ' +
+                           'pigz exit code: %s' % pigz.returncode)
+
+
 class Setdeploy(Command):
     """Set deploy mode
 
@@ -211,18 +431,13 @@ class Setdeploy(Command):
         return parser
 
     def take_action(self, parsed_args):
-        try:
-            mode = parsed_args.mode.strip()
-            remote_flag = False
-            if mode == 'remote':
-                remote_flag = True
-            elif mode != 'local':
-                raise CommandError('Invalid deploy mode. Mode must be ' +
-                                   'either "local" or "remote"')
-            inventory = Inventory.load()
-            inventory.set_deploy_mode(remote_flag)
-            Inventory.save(inventory)
-        except CommandError as e:
-            raise e
-        except Exception:
-            raise Exception(traceback.format_exc())
+        mode = parsed_args.mode.strip()
+        remote_flag = False
+        if mode == 'remote':
+            remote_flag = True
+        elif mode != 'local':
+            raise CommandError('Invalid deploy mode. Mode must be ' +
+                               'either "local" or "remote"')
+        inventory = Inventory.load()
+        inventory.set_deploy_mode(remote_flag)
+        Inventory.save(inventory)
@@ -13,8 +13,10 @@
 #    under the License.
 import argparse
 import getpass
+import json
 import logging
-import traceback
+import six
+import sys
 
 from cliff.command import Command
 from cliff.lister import Lister
@@ -22,6 +24,8 @@ from cliff.lister import Lister
 from kollacli.ansible.passwords import clear_password
 from kollacli.ansible.passwords import get_password_names
 from kollacli.ansible.passwords import set_password
+from kollacli.ansible.passwords import set_passwords
+from kollacli.exceptions import CommandError
 
 
 class PasswordSet(Command):
@@ -32,22 +36,51 @@ class PasswordSet(Command):
     def get_parser(self, prog_name):
         parser = super(PasswordSet, self).get_parser(prog_name)
         parser.add_argument('passwordname', metavar='<passwordname>',
-                            help='passwordname')
+                            nargs='?', help='passwordname')
         parser.add_argument('--insecure', nargs='?', help=argparse.SUPPRESS)
+        parser.add_argument('--batch', action='store_true',
+                            help='set the passwords in a json dict of ' +
+                            '{ passwordname: password } read from stdin')
         return parser
 
     def take_action(self, parsed_args):
+        if parsed_args.batch:
+            if parsed_args.passwordname:
+                raise CommandError('Password name cannot be used ' +
+                                   'with --batch')
+            set_passwords(self._read_batch())
+            return
+
+        if not parsed_args.passwordname:
+            raise CommandError('Password name is required ' +
+                               'unless --batch is used')
+        password_name = parsed_args.passwordname.strip()
+        if parsed_args.insecure:
+            password = parsed_args.insecure.strip()
+        else:
+            password = getpass.getpass('Password: ').strip()
+
+        set_password(password_name, password)
+
+    def _read_batch(self):
+        """read the { passwordname: password } dict from stdin"""
         try:
-            password_name = parsed_args.passwordname.strip()
-            if parsed_args.insecure:
-                password = parsed_args.insecure.strip()
-            else:
-                password = getpass.getpass('Password: ').strip()
-
-            set_password(password_name, password)
-
-        except Exception:
-            raise Exception(traceback.format_exc())
+            batch = json.load(sys.stdin)
+        except ValueError as e:
+            raise CommandError('Invalid password batch: %s' % e)
+        if not isinstance(batch, dict):
+            raise CommandError('Password batch must be a json dict of ' +
+                               '{ passwordname: password }')
+        passwords = {}
+        for name, password in batch.items():
+            if not isinstance(password, six.string_types):
+                raise CommandError('Password for %s must be ' % name +
+                                   'a string')
+            name = name.strip()
+            if not name:
+                raise CommandError('Password name cannot be empty')
+            passwords[name] = password.strip()
+        return passwords
 
 
 class PasswordClear(Command):
@@ -62,11 +95,8 @@ class PasswordClear(Command):
         return parser
 
     def take_action(self, parsed_args):
-        try:
-            password_name = parsed_args.passwordname.strip()
-            clear_password(password_name)
-        except Exception:
-            raise Exception(traceback.format_exc())
+        password_name = parsed_args.passwordname.strip()
+        clear_password(password_name)
 
 
 class PasswordList(Lister):
@@ -75,11 +105,6 @@ class PasswordList(Lister):
     log = logging.getLogger(__name__)
 
     def take_action(self, parsed_args):
-        password_names = get_password_names()
-        password_names = sorted(password_names)
-
-        data = []
-        for password_name in password_names:
-            data.append((password_name, '-'))
-
-        return (('Password Name',  'Password'), data)
+        password_names = sorted(get_password_names())
+        return (('Password Name', 'Password'),
+                ((password_name, '-') for password_name in password_names))
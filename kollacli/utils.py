@@ -18,6 +18,8 @@ import pexpect
 import pwd
 import yaml
 
+WRITE_BUFFER_SIZE = 1 << 20
+
 
 def get_kolla_home():
     return os.environ.get("KOLLA_HOME", "/usr/share/kolla/")
@@ -154,25 +156,45 @@ def change_property(file_path, property_key, property_value, clear=False):
     If not clear, and key is not found, the new property will be appended.
     If not clear, and key is found, edit property in place.
     """
+    change_properties(file_path, {property_key: property_value}, clear)
+
+
+def change_properties(file_path, properties, clear=False):
+    """change multiple properties within a file
+
+    file_path:         path to property file
+    properties:        dict of { property name: property value }
+    clear:             flag to remove the properties
+
+    Same as change_property, but the file is read and written once for
+    all the properties. A line holds a property if the text before its
+    first ':' is the property name.
+    """
     try:
         new_contents = []
         read_data = sync_read_file(file_path)
+        # split on '\n' only, splitlines() would also split values at
+        # other line break chars (e.g. '\x0c' or '\u2028')
         lines = read_data.split('\n')
-        new_line = '%s: "%s"\n' % (property_key, property_value)
-        property_key_found = False
+        if lines[-1] == '':
+            # the newline that ends the file
+            lines.pop()
+        found_keys = set()
         for line in lines:
-            if line[0:len(property_key)] == property_key:
-                property_key_found = True
+            key = line.split(':', 1)[0].rstrip()
+            if ':' in line and key in properties:
+                found_keys.add(key)
                 if clear:
                     # clear existing property
-                    line = ''
-                else:
-                    # edit existing property
-                    line = new_line
+                    continue
+                # edit existing property
+                line = '%s: "%s"' % (key, properties[key])
             new_contents.append(line + '\n')
-        if not property_key_found and not clear:
-            # add new property to file
-            new_contents.append(new_line)
+        if not clear:
+            for key, value in properties.items():
+                if key not in found_keys:
+                    # add new property to file
+                    new_contents.append('%s: "%s"\n' % (key, value))
 
         write_data = ''.join(new_contents)
         sync_write_file(file_path, write_data)
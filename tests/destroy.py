@@ -20,7 +20,7 @@ from kollacli.ansible import inventory
 import unittest
 
 DISABLED_SERVICES = [
-    'cinder', 'glance', 'haproxy', 'heat', 'rabbitmq'
+    'cinder', 'glance', 'haproxy', 'heat', 'rabbitmq',
     'horizon', 'keystone', 'murano', 'neutron', 'nova',
     ]
 ENABLED_SERVICES = [
@@ -39,7 +39,7 @@ class TestFunctional(KollaCliTest):
         # add host to inventory
         hostnames = test_config.get_hostnames()
         if hostnames:
-            hostname = test_config.get_hostnames()[0]
+            hostname = hostnames[0]
             is_physical_host = True
             pwd = test_config.get_password(hostname)
         else:
@@ -93,19 +93,18 @@ class TestFunctional(KollaCliTest):
                           'Unexpected exception in deploy: %s' % e)
 
         if is_physical_host:
-            docker_ps = test_config.run_remote_cmd('docker ps', hostname)
-            docker_ps = docker_ps.replace('\r', '\n')
+            ps_words = self._get_ps_words(test_config, hostname)
             for disabled_service in DISABLED_SERVICES:
-                self.assertNotIn(disabled_service, docker_ps,
+                self.assertFalse(self._is_running(disabled_service, ps_words),
                                  'disabled service: %s ' % disabled_service +
                                  'is running on host: %s ' % hostname +
                                  'after deploy.')
 
             for enabled_service in ENABLED_SERVICES:
-                self.assertIn(enabled_service, docker_ps,
-                              'enabled service: %s ' % enabled_service +
-                              'is not running on host: %s ' % hostname +
-                              'after deploy.')
+                self.assertTrue(self._is_running(enabled_service, ps_words),
+                                'enabled service: %s ' % enabled_service +
+                                'is not running on host: %s ' % hostname +
+                                'after deploy.')
 
         # destroy services (via --stop flag)
         try:
@@ -116,19 +115,28 @@ class TestFunctional(KollaCliTest):
                           'Unexpected exception in 2nd destroy: %s' % e)
 
         if is_physical_host:
-            docker_ps = test_config.run_remote_cmd('docker ps', hostname)
+            ps_words = self._get_ps_words(test_config, hostname)
             for disabled_service in DISABLED_SERVICES:
-                self.assertNotIn(disabled_service, docker_ps,
+                self.assertFalse(self._is_running(disabled_service, ps_words),
                                  'disabled service: %s ' % disabled_service +
                                  'is running on host: %s ' % hostname +
                                  'after destroy.')
 
             for enabled_service in ENABLED_SERVICES:
-                self.assertNotIn(enabled_service, docker_ps,
+                self.assertFalse(self._is_running(enabled_service, ps_words),
                                  'enabled service: %s ' % enabled_service +
                                  'is still running on host: %s ' % hostname +
                                  'after destroy.')
 
+    def _get_ps_words(self, test_config, hostname):
+        """get the set of words in the docker ps output of a host"""
+        docker_ps = test_config.run_remote_cmd('docker ps', hostname)
+        return set(docker_ps.split())
+
+    def _is_running(self, service, ps_words):
+        # image and container names contain the service name
+        return any(service in word for word in ps_words)
+
     def tearDown(self):
         # re-enabled disabled services
         for disabled_service in DISABLED_SERVICES:
@@ -13,6 +13,9 @@
 #   under the License.
 #
 from common import KollaCliTest
+
+import json
+import subprocess
 import unittest
 
 
@@ -57,6 +60,25 @@ class TestFunctional(KollaCliTest):
                          '(%s/%s) not in output: %s' %
                          (key, value, msg))
 
+    def test_password_set_batch(self):
+        passwords = {'TeStKeY1': 'value1',
+                     'TeStKeY2': 'value2'}
+        cmd = '%s password set --batch' % self.cmd_prefix
+        proc = subprocess.Popen(cmd.split(), stdin=subprocess.PIPE,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT,
+                                universal_newlines=True)
+        msg, _ = proc.communicate(json.dumps(passwords))
+        self.assertEqual(0, proc.returncode,
+                         'batch set failed: (%s), cmd: %s' % (msg, cmd))
+
+        msg = self.run_cli_cmd('password list')
+        for key in passwords:
+            ok = self._password_value_exists(key, '-', msg)
+            self.assertTrue(ok, 'batch set password failed. Password ' +
+                            '(%s) not in output: %s' % (key, msg))
+            self.run_cli_cmd('password clear %s' % key)
+
     def _password_value_exists(self, key, value, cli_output):
         """Verify cli data against model data"""
         # check for any host in cli output that shouldn't be there
@@ -13,6 +13,10 @@
 #   under the License.
 #
 from common import KollaCliTest
+
+from kollacli.utils import get_kolla_etc
+
+import os
 import unittest
 
 
@@ -53,6 +57,42 @@ class TestFunctional(KollaCliTest):
         self.assertFalse(ok, 'clear failed property in output: %s, %s' %
                          (key, value))
 
+    def test_property_set_clear_exact_key(self):
+        # a key that is a prefix of another key must not change it
+        long_key = 'TeStKeY_LoNg'
+        long_value = 'TeStVaLuE_LoNg'
+        key = 'TeStKeY'
+        value = 'TeStVaLuE'
+        self.run_cli_cmd('property set %s %s' % (long_key, long_value))
+        self.run_cli_cmd('property set %s %s' % (key, value))
+        msg = self.run_cli_cmd('property list')
+        ok = self._property_value_exists(long_key, long_value, msg)
+        self.assertTrue(ok, 'set changed other property: %s, %s' %
+                        (long_key, long_value))
+        ok = self._property_value_exists(key, value, msg)
+        self.assertTrue(ok, 'set failed property not in output: %s, %s' %
+                        (key, value))
+
+        # clear removes the property line, and only that line
+        globals_path = os.path.join(get_kolla_etc(), 'globals.yml')
+        with open(globals_path) as globals_file:
+            line_count = len(globals_file.readlines())
+        self.run_cli_cmd('property clear %s' % key)
+        with open(globals_path) as globals_file:
+            lines = globals_file.readlines()
+        self.assertEqual(line_count - 1, len(lines),
+                         'clear did not remove one line from globals.yml')
+        msg = self.run_cli_cmd('property list')
+        ok = self._property_value_exists(long_key, long_value, msg)
+        self.assertTrue(ok, 'clear removed other property: %s, %s' %
+                        (long_key, long_value))
+
+        self.run_cli_cmd('property clear %s' % long_key)
+        msg = self.run_cli_cmd('property list')
+        ok = self._property_value_exists(long_key, long_value, msg)
+        self.assertFalse(ok, 'clear failed property in output: %s, %s' %
+                         (long_key, long_value))
+
     def _property_value_exists(self, key, value, cli_output):
         """Verify cli data against model data"""
         # check for any host in cli output that shouldn't be there
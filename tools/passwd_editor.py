@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 import getopt
+import json
 import sys
 
 from kollacli import utils
@@ -43,13 +44,15 @@ def main():
     -v value # value of password
     -c       # flag to clear the password
     -l       # print to stdout a csv string of the existing keys
+    -b       # read a json dict of { key: value } from stdin and set them all
     """
-    opts, _ = getopt.getopt(sys.argv[1:], 'p:k:v:cl')
+    opts, _ = getopt.getopt(sys.argv[1:], 'p:k:v:clb')
     path = ''
     pwd_key = ''
     pwd_value = ''
     clear_flag = False
     list_flag = False
+    batch_flag = False
     for opt, arg in opts:
         if opt == '-p':
             path = arg
@@ -61,10 +64,15 @@ def main():
             clear_flag = True
         elif opt == '-l':
             list_flag = True
+        elif opt == '-b':
+            batch_flag = True
 
     if list_flag:
         # print the password keys
         _print_pwd_keys(path)
+    elif batch_flag:
+        # edit a batch of passwords
+        utils.change_properties(path, json.load(sys.stdin))
     else:
         # edit a password
         utils.change_property(path, pwd_key, pwd_value, clear_flag)